@@ -1,10 +1,23 @@
 import os
+import re
+import io
 import json
+import time
+import uuid
+import asyncio
+import collections
+import hashlib
+import sqlite3
+import threading
+from contextlib import asynccontextmanager, contextmanager
+import httpx
+import diskcache
+import numpy as np
+import zstandard as zstd
 import streamlit as st
-from openai import OpenAI
-from dotenv import load_dotenv
+from openai import OpenAI, AsyncOpenAI
 import logging
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Set up logging
 logging.basicConfig(
@@ -13,16 +26,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Load environment variables
-load_dotenv()
+# Page config - must be the first Streamlit command; cached resources below emit spinner elements
+st.set_page_config(
+    page_title="Quick MD Helper",
+    page_icon="⚡",
+    layout="centered"
+)
 
-# Get API key - try st.secrets first (for Streamlit Cloud), then environment variable
-try:
-    api_key = st.secrets.get("OPENAI_API_KEY", None)
-    logger.info("Loaded API key from st.secrets")
-except:
-    api_key = os.getenv("OPENAI_API_KEY")
+@st.cache_resource
+def init_env():
+    """Load environment variables and resolve the API key once per process"""
+    from dotenv import load_dotenv
+    load_dotenv()
+    
+    # Get API key - try st.secrets first (for Streamlit Cloud), then environment variable
+    try:
+        key = st.secrets.get("OPENAI_API_KEY", None)
+        if key:
+            logger.info("Loaded API key from st.secrets")
+            return key
+    except:
+        pass
+    key = os.getenv("OPENAI_API_KEY")
+    if not key:
+        # Raise rather than return None so a missing key is not cached and is re-checked next rerun
+        raise RuntimeError("OPENAI_API_KEY not found")
     logger.info("Loaded API key from environment")
+    return key
+
+try:
+    api_key = init_env()
+except RuntimeError:
+    api_key = None
 
 logger.info(f"API Key loaded: {'Yes' if api_key else 'No'}")
 logger.info(f"API Key length: {len(api_key) if api_key else 0}")
@@ -46,9 +81,28 @@ if not api_key:
     """)
     st.stop()
 
+# Shared HTTP/2 connection pool settings
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=50, keepalive_expiry=60.0)
+HTTP_TIMEOUT = httpx.Timeout(600.0, connect=10.0)  # o3 can reason for minutes before the first token
+
+@st.cache_resource
+def get_client(api_key):
+    """Build one keep-alive OpenAI client per process and pre-warm its connection"""
+    http_client = httpx.Client(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+    client = OpenAI(api_key=api_key, http_client=http_client)
+    
+    # Pre-warm in the background so the first page load is not blocked on the handshake
+    def prewarm():
+        try:
+            client.models.retrieve("o3")
+        except Exception as e:
+            logger.warning(f"Connection pre-warm failed: {e}")
+    threading.Thread(target=prewarm, daemon=True).start()
+    return client
+
 # Initialize client with error handling
 try:
-    client = OpenAI(api_key=api_key)
+    client = get_client(api_key)
     logger.info("OpenAI client initialized successfully")
 except Exception as e:
     logger.error(f"Failed to initialize OpenAI client: {e}")
@@ -78,13 +132,57 @@ If evidence weak or guideline absent, begin with "Guideline match: NONE".
 
 TASK: {task_instruction}"""
 
-# Page config
-st.set_page_config(
-    page_title="Quick MD Helper",
-    page_icon="⚡",
-    layout="centered"
+# Guideline year citation (2022 or later)
+YEAR_RE = re.compile(r"\b(202[2-9])\b")
+
+# Pre-format per-task system prompts so the message prefix is byte-identical across calls
+@st.cache_resource
+def build_system_prompts():
+    """Format each task's system prompt once per process"""
+    return {
+        task_name: SYSTEM_PROMPT.format(task_instruction=task_instruction)
+        for task_name, task_instruction in TOPICS.items()
+    }
+
+SYSTEM_PROMPTS = build_system_prompts()
+
+# JSON keys for the bundled all-tasks request
+TASK_KEYS = {
+    "Treatment": "treatment",
+    "Confirmatory test": "confirmatory",
+    "Differential & next steps": "differential"
+}
+
+# Single system prompt asking for every task at once as a JSON object
+BUNDLED_SYSTEM_PROMPT = SYSTEM_PROMPT.format(
+    task_instruction=(
+        "Complete each task below separately, applying OUTPUT STYLE and ACCURACY RULE to each.\n"
+        + "\n".join(f'- "{TASK_KEYS[task_name]}": {task_instruction}' for task_name, task_instruction in TOPICS.items())
+        + "\n\nRespond ONLY with a JSON object with keys "
+        + ", ".join(f'"{key}"' for key in TASK_KEYS.values())
+        + ". Each value is that task's bullets as one string, one bullet per line."
+    )
 )
 
+# Prebuilt system messages; only the user message changes per call
+BUNDLED_TASK = "All Tasks"
+
+@st.cache_resource
+def build_system_messages():
+    """Build each task's system message once so it is shared by every request"""
+    messages = {
+        task_name: {"role": "system", "content": system_prompt}
+        for task_name, system_prompt in SYSTEM_PROMPTS.items()
+    }
+    messages[BUNDLED_TASK] = {"role": "system", "content": BUNDLED_SYSTEM_PROMPT}
+    return messages
+
+SYSTEM_MESSAGES = build_system_messages()
+
+def build_messages(task_name, case_text):
+    """Copy-on-write: reuse the shared system message, add a fresh user message"""
+    return [SYSTEM_MESSAGES[task_name], {"role": "user", "content": case_text}]
+
 # Custom CSS for better formatting
 st.markdown("""
 <style>
@@ -115,20 +213,102 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Initialize session state for history
+# History store: full responses live in sqlite (zstd-compressed), session state keeps metadata only
+HISTORY_DB = "history.db"
+HISTORY_RETENTION_DAYS = 7     # stored runs (including case text) are deleted after this
+CASE_PREVIEW_CHARS = 100
+
+def prune_history(conn):
+    """Delete runs older than the retention window, whichever session created them"""
+    cutoff = (datetime.now() - timedelta(days=HISTORY_RETENTION_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+    conn.execute("DELETE FROM runs WHERE ts < ?", (cutoff,))
+
+@st.cache_resource
+def get_history_db():
+    """Open the history database once per process"""
+    conn = sqlite3.connect(HISTORY_DB, check_same_thread=False)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS runs("
+        "id INTEGER PRIMARY KEY, run_id TEXT, ts TEXT, type TEXT, "
+        "case_text TEXT, task TEXT, response BLOB)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS runs_run_id ON runs(run_id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS runs_ts ON runs(ts)")
+    prune_history(conn)
+    conn.commit()
+    return {"conn": conn, "lock": threading.Lock()}
+
+history_db = get_history_db()
+
+def save_run(run_type, case_text, results):
+    """Persist a run and return the lightweight entry kept in session state"""
+    run_id = uuid.uuid4().hex
+    timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with history_db["lock"], history_db["conn"] as conn:
+        # Prune on every write so long-running servers also enforce retention
+        prune_history(conn)
+        conn.executemany(
+            "INSERT INTO runs(run_id, ts, type, case_text, task, response) VALUES(?,?,?,?,?,?)",
+            [
+                (run_id, timestamp, run_type, case_text, task_name, zstd.compress(answer.encode()))
+                for task_name, answer in results.items()
+            ]
+        )
+    return {
+        'run_id': run_id,
+        'timestamp': timestamp,
+        'type': run_type,
+        'case_preview': case_text[:CASE_PREVIEW_CHARS] + ("…" if len(case_text) > CASE_PREVIEW_CHARS else ""),
+        'tasks': len(results)
+    }
+
+def load_run(run_id):
+    """Fetch a run's full case text and decompressed responses"""
+    with history_db["lock"]:
+        rows = history_db["conn"].execute(
+            "SELECT case_text, task, response FROM runs WHERE run_id=? ORDER BY id",
+            (run_id,)
+        ).fetchall()
+    case_text = rows[0][0] if rows else ""
+    results = {task_name: zstd.decompress(response).decode() for _, task_name, response in rows}
+    return case_text, results
+
+def delete_runs(run_ids):
+    """Remove runs from the history database"""
+    with history_db["lock"], history_db["conn"] as conn:
+        conn.executemany("DELETE FROM runs WHERE run_id=?", [(run_id,) for run_id in run_ids])
+
+# Initialize session state for history (bounded; evicted runs are deleted from the database,
+# and runs left behind by ended sessions expire after HISTORY_RETENTION_DAYS)
+HISTORY_MAX_RUNS = 50
+
 if 'history' not in st.session_state:
-    st.session_state.history = []
+    st.session_state.history = collections.deque(maxlen=HISTORY_MAX_RUNS)
+if 'pending_batches' not in st.session_state:
+    st.session_state.pending_batches = []
+
+def record_run(run_type, case_text, results):
+    """Save a run and add it to session history, deleting the run it evicts"""
+    history = st.session_state.history
+    if len(history) == history.maxlen:
+        delete_runs([history[0]['run_id']])
+    history.append(save_run(run_type, case_text, results))
 
 # Load templates
-try:
-    with open("common_cases.json") as f:
-        TEMPLATES = json.load(f)
-except FileNotFoundError:
-    TEMPLATES = {
-        "Chest Pain": "45yo M presents with acute substernal chest pain, radiating to left arm, associated with diaphoresis and nausea. BP 140/90, HR 95.",
-        "UTI": "28yo F with dysuria, urinary frequency, and suprapubic pain x2 days. No fever or flank pain. Urine dipstick positive for nitrites and leukocytes.",
-        "COPD Exacerbation": "68yo M with known COPD, increased dyspnea and productive cough with yellow sputum x3 days. Using rescue inhaler q2h. O2 sat 88% on RA."
-    }
+@st.cache_resource
+def load_templates():
+    """Read template cases once per process instead of on every rerun"""
+    try:
+        with open("common_cases.json") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {
+            "Chest Pain": "45yo M presents with acute substernal chest pain, radiating to left arm, associated with diaphoresis and nausea. BP 140/90, HR 95.",
+            "UTI": "28yo F with dysuria, urinary frequency, and suprapubic pain x2 days. No fever or flank pain. Urine dipstick positive for nitrites and leukocytes.",
+            "COPD Exacerbation": "68yo M with known COPD, increased dyspnea and productive cough with yellow sputum x3 days. Using rescue inhaler q2h. O2 sat 88% on RA."
+        }
+
+TEMPLATES = load_templates()
 
 # Title and disclaimer
 st.title("⚡ Quick MD Helper")
@@ -173,7 +353,8 @@ with st.expander("📖 How to Use This Tool"):
     - **No PHI**: Never enter patient identifiers or protected health information
     - **Clinical judgment required**: This is a support tool, not a replacement for clinical assessment
     - **Guideline transparency**: Shows "NONE" when evidence is weak or guidelines absent
-    - **Token budget**: Each query uses up to 3,500 tokens (with 5,000 retry if needed)
+    - **Token budget**: Each query uses up to 3,500 tokens at low reasoning effort (with a 5,000-token medium-effort retry if needed)
+    - **Stored on the server**: Patient presentations and responses are saved to a shared history database and response cache on the server, visible to anyone with server access, and deleted after 7 days (or when you clear your history)
     """)
 
 # Task selection
@@ -193,6 +374,7 @@ case = st.text_area(
     height=150,
     placeholder="Enter de-identified patient presentation..."
 )
+case_clean = case.strip()
 
 # Action buttons
 col1, col2, col3 = st.columns(3)
@@ -208,20 +390,234 @@ with col3:
 # Token budget constants
 MAX_TOKENS = 3500          # conservative first try
 MAX_TOKENS_RETRY = 5000    # ultra-conservative fallback
+BUNDLE_MAX_TOKENS = 8000   # all three tasks in one JSON response
+MIN_ANSWER_CHARS = 50      # shorter answers are treated as truncated
+MAX_CASE_TOKENS = 2000     # longer presentations are cut before sending
+MAX_CASE_CHARS = MAX_CASE_TOKENS * 4   # rough cap used when the tokenizer is unavailable
 
-def call_o3(messages, max_tok):
-    """Call o3 with specified token limit"""
+@st.cache_resource
+def get_encoder():
+    """Load the o3 tokenizer once per process, or None if it cannot be loaded"""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model("o3")
+        except KeyError:
+            return tiktoken.get_encoding("o200k_base")
+    except Exception as e:
+        # tiktoken downloads its vocabulary on first use; cache the failure instead of retrying every click
+        logger.warning(f"Tokenizer unavailable, falling back to character cap: {e}")
+        return None
+
+def truncate_case(case_text):
+    """Cap the case at MAX_CASE_TOKENS, returning (text, truncated)"""
+    encoder = get_encoder()
+    if encoder is None:
+        if len(case_text) <= MAX_CASE_CHARS:
+            return case_text, False
+        logger.warning(f"Case truncated from {len(case_text)} to {MAX_CASE_CHARS} characters")
+        return case_text[:MAX_CASE_CHARS].strip(), True
+    
+    tokens = encoder.encode(case_text)
+    if len(tokens) <= MAX_CASE_TOKENS:
+        return case_text, False
+    logger.warning(f"Case truncated from {len(tokens)} to {MAX_CASE_TOKENS} tokens")
+    return encoder.decode(tokens[:MAX_CASE_TOKENS]).strip(), True
+
+@st.cache_resource
+def get_escalation_stats():
+    """Process-wide counters for how often low effort has to be escalated"""
+    return {"lock": threading.Lock(), "calls": 0, "escalations": 0}
+
+escalation_stats = get_escalation_stats()
+
+def needs_escalation(answer):
+    """Low-effort answer is empty, truncated, or cites no guideline"""
+    text = answer.strip()
+    if len(text) < MIN_ANSWER_CHARS:
+        return True
+    return "guideline" not in text.lower() and not YEAR_RE.search(text)
+
+def record_escalation(task_name, escalated):
+    """Update and log the running escalation rate"""
+    with escalation_stats["lock"]:
+        escalation_stats["calls"] += 1
+        escalation_stats["escalations"] += int(escalated)
+        calls, escalations = escalation_stats["calls"], escalation_stats["escalations"]
+    if escalated:
+        logger.warning(f"Low-effort answer for {task_name} insufficient → escalating to medium")
+    logger.info(f"Escalation rate: {escalations}/{calls} ({escalations / calls:.0%})")
+
+# Response cache settings
+CACHE_DIR = ".o3_cache"
+CACHE_EXPIRE = 86400 * 7   # one week
+
+@st.cache_resource
+def get_response_cache():
+    """Open the on-disk response cache once per process"""
+    return diskcache.Cache(CACHE_DIR)
+
+response_cache = get_response_cache()
+
+def cache_key(task_name, case_text, system_prompt):
+    """Hash the inputs that fully determine a response"""
+    return hashlib.blake2b(
+        f"{task_name}|{case_text}|{system_prompt}".encode(),
+        digest_size=16
+    ).hexdigest()
+
+@st.cache_resource
+def get_inflight():
+    """Process-wide map of cache keys to events for requests currently in flight"""
+    return {"lock": threading.Lock(), "events": {}}
+
+inflight = get_inflight()
+
+def _join_flight(key):
+    """Register as leader for key, or return the leader's event to wait on"""
+    with inflight["lock"]:
+        event = inflight["events"].get(key)
+        if event is None:
+            inflight["events"][key] = threading.Event()
+            return None
+        return event
+
+def _land_flight(key):
+    """Release waiters once the leader has finished"""
+    with inflight["lock"]:
+        event = inflight["events"].pop(key)
+    event.set()
+
+@contextmanager
+def single_flight(key):
+    """Yield True for the caller that should do the work; others wait for it and get False"""
+    event = _join_flight(key)
+    if event is not None:
+        logger.info("Identical request already in flight → waiting for it")
+        event.wait()
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        _land_flight(key)
+
+@asynccontextmanager
+async def asingle_flight(key):
+    """Async counterpart of single_flight; waits without blocking the event loop"""
+    event = _join_flight(key)
+    if event is not None:
+        logger.info("Identical request already in flight → waiting for it")
+        await asyncio.to_thread(event.wait)
+        yield False
+        return
+    try:
+        yield True
+    finally:
+        _land_flight(key)
+
+# Semantic cache settings
+EMBEDDING_MODEL = "text-embedding-3-small"
+SEMANTIC_THRESHOLD = 0.95      # cosine similarity needed to reuse an answer
+SEMANTIC_MAX_ENTRIES = 5000    # oldest entries are dropped beyond this
+SEMANTIC_DIR = os.path.join(CACHE_DIR, "semantic")
+
+def prompt_key(task_name, system_prompt):
+    """Hash identifying the task/prompt an embedding entry belongs to"""
+    return hashlib.blake2b(
+        f"{task_name}|{system_prompt}".encode(),
+        digest_size=16
+    ).hexdigest()
+
+@st.cache_resource
+def get_semantic_index():
+    """Load unexpired semantic entries into an in-memory matrix once per process"""
+    store = diskcache.Cache(SEMANTIC_DIR)
+    entries = [entry for entry in (store.get(key) for key in store.iterkeys()) if entry is not None]
+    entries.sort(key=lambda entry: entry["expires"])
+    entries = entries[-SEMANTIC_MAX_ENTRIES:]
+    
+    embeddings = np.array([entry["embedding"] for entry in entries], dtype=np.float32)
+    return {
+        "lock": threading.Lock(),
+        "store": store,
+        "ids": [entry["id"] for entry in entries],
+        "embeddings": embeddings,
+        "norms": np.linalg.norm(embeddings, axis=1) if entries else np.zeros(0, dtype=np.float32),
+        "prompt_keys": np.array([entry["prompt_key"] for entry in entries], dtype=object),
+        "expires": np.array([entry["expires"] for entry in entries], dtype=np.float64),
+        "answers": [entry["answer"] for entry in entries],
+        "cases": [entry.get("case", "") for entry in entries]
+    }
+
+semantic_index = get_semantic_index()
+
+def semantic_lookup(p_key, embedding):
+    """Return (answer, source case) for the most similar prior case if close enough, else None"""
+    q = np.asarray(embedding, dtype=np.float32)
+    with semantic_index["lock"]:
+        if not semantic_index["answers"]:
+            return None
+        sims = (semantic_index["embeddings"] @ q) / (semantic_index["norms"] * np.linalg.norm(q) + 1e-12)
+        sims[(semantic_index["prompt_keys"] != p_key) | (semantic_index["expires"] <= time.time())] = -1.0
+        best = int(np.argmax(sims))
+        similarity = sims[best]
+        answer, source_case = semantic_index["answers"][best], semantic_index["cases"][best]
+    
+    if similarity > SEMANTIC_THRESHOLD:
+        logger.info(f"Semantic cache hit (similarity {similarity:.3f})")
+        return answer, source_case
+    return None
+
+def semantic_store(p_key, embedding, answer, case_text):
+    """Append an entry in memory and persist it as its own row, expiring like exact entries"""
+    q = np.asarray(embedding, dtype=np.float32)
+    entry = {
+        "id": uuid.uuid4().hex,
+        "embedding": q,
+        "prompt_key": p_key,
+        "answer": answer,
+        "case": case_text,
+        "expires": time.time() + CACHE_EXPIRE
+    }
+    
+    with semantic_index["lock"]:
+        semantic_index["store"].set(entry["id"], entry, expire=CACHE_EXPIRE)
+        
+        embeddings = semantic_index["embeddings"]
+        semantic_index["embeddings"] = np.vstack([embeddings, q[None, :]]) if embeddings.size else q[None, :]
+        semantic_index["norms"] = np.append(semantic_index["norms"], np.linalg.norm(q))
+        semantic_index["prompt_keys"] = np.append(semantic_index["prompt_keys"], np.array([p_key], dtype=object))
+        semantic_index["expires"] = np.append(semantic_index["expires"], entry["expires"])
+        semantic_index["ids"].append(entry["id"])
+        semantic_index["answers"].append(answer)
+        semantic_index["cases"].append(case_text)
+        
+        # Drop the oldest entries beyond the cap
+        overflow = len(semantic_index["ids"]) - SEMANTIC_MAX_ENTRIES
+        if overflow > 0:
+            for old_id in semantic_index["ids"][:overflow]:
+                semantic_index["store"].delete(old_id)
+            for name in ("embeddings", "norms", "prompt_keys", "expires", "ids", "answers", "cases"):
+                semantic_index[name] = semantic_index[name][overflow:]
+
+def call_o3(messages, max_tok, effort="low", response_format=None):
+    """Call o3 with specified token limit, streaming the response"""
     # Log OpenAI library version
     import openai
     logger.info(f"OpenAI library version: {openai.__version__}")
     
+    extra = {"response_format": response_format} if response_format else {}
+    
     # Try with max_completion_tokens first, fall back to max_tokens if needed
     try:
         return client.chat.completions.create(
             model="o3",
             max_completion_tokens=max_tok,
-            reasoning_effort="medium",  # medium effort for balanced accuracy/cost
-            messages=messages
+            reasoning_effort=effort,
+            messages=messages,
+            stream=True,
+            **extra
         )
     except TypeError as e:
         if "max_completion_tokens" in str(e):
@@ -229,26 +625,97 @@ def call_o3(messages, max_tok):
             return client.chat.completions.create(
                 model="o3",
                 max_tokens=max_tok,
-                messages=messages
+                messages=messages,
+                stream=True,
+                **extra
             )
         else:
             raise e
 
-def display_result(task_name, answer, col=None):
-    """Display formatted result for a task"""
+def collect_stream(response, placeholder=None):
+    """Accumulate streamed deltas, rendering partial output as it arrives"""
+    buf = ""
+    # Always close the response so an interrupted render returns the connection to the pool
+    with response as stream:
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if delta:
+                buf += delta
+                if placeholder is not None:
+                    placeholder.markdown(buf)
+    return buf
+
+async def acall_o3(aclient, messages, max_tok, effort="low"):
+    """Async counterpart of call_o3 for running tasks concurrently"""
+    try:
+        return await aclient.chat.completions.create(
+            model="o3",
+            max_completion_tokens=max_tok,
+            reasoning_effort=effort,
+            messages=messages,
+            stream=True
+        )
+    except TypeError as e:
+        if "max_completion_tokens" in str(e):
+            logger.warning("max_completion_tokens not supported, falling back to max_tokens")
+            return await aclient.chat.completions.create(
+                model="o3",
+                max_tokens=max_tok,
+                messages=messages,
+                stream=True
+            )
+        else:
+            raise e
+
+async def acollect_stream(response, placeholder=None):
+    """Async counterpart of collect_stream"""
+    buf = ""
+    async with response as stream:
+        async for chunk in stream:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content or ""
+            if delta:
+                buf += delta
+                if placeholder is not None:
+                    placeholder.markdown(buf)
+    return buf
+
+def request_fresh_run(action):
+    """Button callback: repeat the run on the next rerun without similar-case reuse"""
+    st.session_state.fresh_run = action
+
+def display_result(task_name, answer, col=None, cached=False, fresh_action=None):
+    """Display formatted result for a task
+
+    cached is True for an exact cache hit, or the matched presentation text when
+    the answer was reused from a similar case.
+    """
     # Use the column if provided, otherwise use main streamlit container
     container = col if col else st
     
     # Task header
     container.markdown(f"#### {task_name}")
+    if isinstance(cached, str):
+        container.warning(f"🔁 **Reused from a similar case** – confirm it matches this patient:\n\n{cached}")
+        if fresh_action:
+            container.button(
+                "🔄 Run fresh for this case",
+                key=f"fresh_{task_name}",
+                on_click=request_fresh_run,
+                args=(fresh_action,)
+            )
+    elif cached:
+        container.caption("⚡ Cached response")
     
     # Extract guideline year
     guideline_tag = "NONE"
     if answer and answer != "[Still empty after retry]":
-        for year in ["2025", "2024", "2023", "2022"]:
-            if year in answer:
-                guideline_tag = year
-                break
+        m = YEAR_RE.search(answer)
+        if m:
+            guideline_tag = m.group(1)
     
     # Guideline status badge
     if guideline_tag != "NONE":
@@ -258,125 +725,432 @@ def display_result(task_name, answer, col=None):
     
     # Format and display answer
     if answer and answer != "[Still empty after retry]":
-        lines = answer.strip().split('\n')
-        formatted_answer = ""
+        lines = (line.strip() for line in answer.strip().split('\n'))
+        bullets = [line if line.startswith('•') else f"• {line}" for line in lines if line]
+        formatted_answer = "\n\n".join(bullets)
         
-        for line in lines:
-            line = line.strip()
-            if line:
-                if not line.startswith('•'):
-                    line = f"• {line}"
-                formatted_answer += f"{line}\n\n"
-        
-        container.info(formatted_answer.strip())
+        container.info(formatted_answer)
     else:
         container.error("❌ No response received")
 
-def process_task(task_name, task_instruction, case_text):
-    """Process a single task and return the answer"""
+def lookup_exact(task_name, case_text):
+    """Return the exact-match cached answer for a task, or None"""
+    answer = response_cache.get(cache_key(task_name, case_text, SYSTEM_PROMPTS[task_name]))
+    if answer is not None:
+        logger.info(f"Cache hit for {task_name}")
+    return answer
+
+def lookup_similar(task_name, embedding):
+    """Return (answer, source case) cached for a near-duplicate case, or None"""
+    if embedding is None:
+        return None
+    return semantic_lookup(prompt_key(task_name, SYSTEM_PROMPTS[task_name]), embedding)
+
+def embed_case(case_text):
+    """Embed a case for semantic lookup, or None if the embedding call fails"""
+    try:
+        return client.embeddings.create(model=EMBEDDING_MODEL, input=case_text).data[0].embedding
+    except Exception as e:
+        logger.warning(f"Semantic cache unavailable: {e}")
+        return None
+
+def should_escalate(task_name, answer):
+    """Decide whether a low-effort answer needs a medium-effort retry, tracking the rate"""
+    escalate = needs_escalation(answer)
+    record_escalation(task_name, escalate)
+    return escalate
+
+def store_answer(task_name, case_text, answer, embedding=None):
+    """Cache a real answer under its exact key and, when embedded, in the semantic index"""
+    # Only cache real answers so an empty result is retried next time
+    if answer == "[Still empty after retry]":
+        return
+    system_prompt = SYSTEM_PROMPTS[task_name]
+    response_cache.set(cache_key(task_name, case_text, system_prompt), answer, expire=CACHE_EXPIRE)
+    if embedding is not None:
+        semantic_store(prompt_key(task_name, system_prompt), embedding, answer, case_text)
+
+def process_task(task_name, case_text, placeholder=None, use_similar=True):
+    """Process a single task and return (answer, cached); see display_result for cached"""
     logger.info(f"Processing task: {task_name}")
     
-    # Build system prompt
-    system_prompt = SYSTEM_PROMPT.format(task_instruction=task_instruction)
-    messages = [
-        {"role": "system", "content": system_prompt},
-        {"role": "user", "content": case_text}
-    ]
+    # Serve byte-identical requests from cache
+    cached_answer = lookup_exact(task_name, case_text)
+    if cached_answer is not None:
+        return cached_answer, True
     
-    # Call API with retry logic
-    start_time = datetime.now()
-    response = call_o3(messages, MAX_TOKENS)
-    answer = response.choices[0].message.content or ""
+    # Share one upstream call between identical concurrent requests
+    with single_flight(cache_key(task_name, case_text, SYSTEM_PROMPTS[task_name])) as leader:
+        if not leader:
+            cached_answer = lookup_exact(task_name, case_text)
+            if cached_answer is not None:
+                return cached_answer, True
+        
+        # Fall back to near-duplicate presentations via embedding similarity
+        embedding = embed_case(case_text)
+        similar = lookup_similar(task_name, embedding) if use_similar else None
+        if similar is not None:
+            return similar
+        
+        # Call API, escalating to medium effort if the low-effort answer falls short
+        t0 = time.perf_counter()
+        answer = collect_stream(call_o3(build_messages(task_name, case_text), MAX_TOKENS, effort="low"), placeholder)
+        if should_escalate(task_name, answer):
+            answer = escalate_task(task_name, case_text, answer, placeholder)
+        logger.info(f"{task_name} completed in {time.perf_counter() - t0:.2f}s")
+        
+        store_answer(task_name, case_text, answer, embedding)
+        return answer, False
+
+def lookup_cached_tasks(case_text, use_similar=True):
+    """Return ({task: (answer, cached)} already in the cache, case embedding or None)"""
+    cached = {}
+    for task_name in SYSTEM_PROMPTS:
+        answer = lookup_exact(task_name, case_text)
+        if answer is not None:
+            cached[task_name] = (answer, True)
     
-    # Retry if empty
-    if answer.strip() == "":
-        logger.warning(f"Empty response for {task_name} → retrying")
-        response = call_o3(messages, MAX_TOKENS_RETRY)
-        answer = response.choices[0].message.content or "[Still empty after retry]"
+    # One embedding serves the semantic lookup for every remaining task and is reused downstream
+    missing = [task_name for task_name in SYSTEM_PROMPTS if task_name not in cached]
+    if not missing:
+        return cached, None
+    embedding = embed_case(case_text)
+    if use_similar:
+        for task_name in missing:
+            similar = lookup_similar(task_name, embedding)
+            if similar is not None:
+                cached[task_name] = similar
+    return cached, embedding
+
+def escalate_task(task_name, case_text, answer, placeholder=None):
+    """Re-run a task at medium effort, keeping the low-effort answer if the retry is empty"""
+    messages = build_messages(task_name, case_text)
+    retry = collect_stream(call_o3(messages, MAX_TOKENS_RETRY, effort="medium"), placeholder)
+    return retry or answer or "[Still empty after retry]"
+
+def process_bundle(case_text, placeholder=None, embedding=None):
+    """Run all tasks in one JSON-mode request and return ({task: answer}, cached)"""
+    logger.info("Processing bundled request for all tasks")
     
-    end_time = datetime.now()
-    logger.info(f"{task_name} completed in {(end_time - start_time).total_seconds():.2f}s")
+    messages = build_messages(BUNDLED_TASK, case_text)
     
-    return answer
+    key = cache_key(BUNDLED_TASK, case_text, BUNDLED_SYSTEM_PROMPT)
+    cached_answers = response_cache.get(key)
+    if cached_answers is not None:
+        logger.info("Cache hit for bundled request")
+        return cached_answers, True
+    
+    # Share one upstream call between identical concurrent requests
+    with single_flight(key) as leader:
+        if not leader:
+            cached_answers = response_cache.get(key)
+            if cached_answers is not None:
+                return cached_answers, True
+        
+        t0 = time.perf_counter()
+        raw = collect_stream(
+            call_o3(messages, BUNDLE_MAX_TOKENS, effort="low", response_format={"type": "json_object"}),
+            placeholder
+        )
+        data = json.loads(raw)
+        
+        # Normalise each task's output to a bullet-per-line string
+        answers = {}
+        for task_name, json_key in TASK_KEYS.items():
+            value = data[json_key]
+            if isinstance(value, list):
+                value = "\n".join(str(item) for item in value)
+            answers[task_name] = str(value)
+        
+        # Escalate weak tasks individually, same as the per-task path, but concurrently
+        weak_answers = {
+            task_name: answer for task_name, answer in answers.items() if should_escalate(task_name, answer)
+        }
+        if weak_answers:
+            if placeholder is not None:
+                placeholder.markdown(f"_Refining {len(weak_answers)} answer(s) at medium reasoning effort..._")
+            answers.update(asyncio.run(escalate_all(case_text, weak_answers)))
+        
+        logger.info(f"Bundled request completed in {time.perf_counter() - t0:.2f}s")
+        
+        if "[Still empty after retry]" not in answers.values():
+            response_cache.set(key, answers, expire=CACHE_EXPIRE)
+        
+        # Also fill the per-task caches so Run Selected and rephrased cases can reuse these answers
+        for task_name, answer in answers.items():
+            store_answer(task_name, case_text, answer, embedding)
+        return answers, False
+
+async def aescalate_task(aclient, task_name, case_text, answer, placeholder=None):
+    """Async counterpart of escalate_task"""
+    messages = build_messages(task_name, case_text)
+    retry = await acollect_stream(await acall_o3(aclient, messages, MAX_TOKENS_RETRY, effort="medium"), placeholder)
+    return retry or answer or "[Still empty after retry]"
+
+async def aprocess_task(aclient, task_name, case_text, placeholder=None, embedding=None):
+    """Async counterpart of process_task; the caller has already checked similar cases"""
+    logger.info(f"Processing task: {task_name}")
+    
+    # Serve byte-identical requests from cache
+    cached_answer = lookup_exact(task_name, case_text)
+    if cached_answer is not None:
+        return cached_answer, True
+    
+    # Share one upstream call between identical concurrent requests
+    async with asingle_flight(cache_key(task_name, case_text, SYSTEM_PROMPTS[task_name])) as leader:
+        if not leader:
+            cached_answer = lookup_exact(task_name, case_text)
+            if cached_answer is not None:
+                return cached_answer, True
+        
+        # Call API, escalating to medium effort if the low-effort answer falls short
+        t0 = time.perf_counter()
+        answer = await acollect_stream(
+            await acall_o3(aclient, build_messages(task_name, case_text), MAX_TOKENS, effort="low"), placeholder
+        )
+        if should_escalate(task_name, answer):
+            answer = await aescalate_task(aclient, task_name, case_text, answer, placeholder)
+        logger.info(f"{task_name} completed in {time.perf_counter() - t0:.2f}s")
+        
+        store_answer(task_name, case_text, answer, embedding)
+        return answer, False
+
+@asynccontextmanager
+async def open_async_client():
+    """Async OpenAI client scoped to the current event loop"""
+    # Pooled connections must not be reused across loops, so each asyncio.run gets its own client
+    async with httpx.AsyncClient(http2=True, limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT) as http_client, \
+            AsyncOpenAI(api_key=api_key, http_client=http_client) as aclient:
+        yield aclient
+
+def raise_control_flow(results):
+    """Re-raise Streamlit's rerun/stop signals captured by gather; they are BaseExceptions, not task failures"""
+    for result in results:
+        if isinstance(result, BaseException) and not isinstance(result, Exception):
+            raise result
+
+async def run_all_tasks(case_text, task_names, placeholders, embedding=None):
+    """Run the given tasks concurrently; exceptions are returned in place of results"""
+    async with open_async_client() as aclient:
+        results = await asyncio.gather(
+            *[
+                aprocess_task(aclient, task_name, case_text, placeholder, embedding)
+                for task_name, placeholder in zip(task_names, placeholders)
+            ],
+            return_exceptions=True
+        )
+    raise_control_flow(results)
+    return results
+
+async def escalate_all(case_text, weak_answers):
+    """Escalate several weak answers concurrently, keeping the original if a retry fails"""
+    async with open_async_client() as aclient:
+        results = await asyncio.gather(
+            *[
+                aescalate_task(aclient, task_name, case_text, answer)
+                for task_name, answer in weak_answers.items()
+            ],
+            return_exceptions=True
+        )
+    raise_control_flow(results)
+    
+    escalated = {}
+    for (task_name, answer), result in zip(weak_answers.items(), results):
+        if isinstance(result, Exception):
+            logger.error(f"Escalation failed for {task_name}: {type(result).__name__}: {str(result)}")
+            escalated[task_name] = answer
+        else:
+            escalated[task_name] = result
+    return escalated
+
+# Batch API settings
+BATCH_POLL_INTERVAL = 60   # seconds between status checks
+BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+@st.cache_resource
+def get_batch_registry():
+    """Process-wide store for batch results written by poller threads"""
+    return {"lock": threading.Lock(), "batches": {}}
+
+batch_registry = get_batch_registry()
+
+def build_batch_jobs(history):
+    """Turn history runs into Batch API request lines re-run against the current prompts"""
+    jobs, job_map = [], {}
+    for entry in history:
+        case_text, results = load_run(entry['run_id'])
+        for task_name in results:
+            if task_name not in SYSTEM_PROMPTS:
+                continue
+            custom_id = uuid.uuid4().hex
+            jobs.append({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": "o3",
+                    "max_completion_tokens": MAX_TOKENS,
+                    "reasoning_effort": "medium",
+                    "messages": build_messages(task_name, case_text)
+                }
+            })
+            job_map[custom_id] = (entry['run_id'], case_text, task_name)
+    return jobs, job_map
+
+def submit_batch(jobs):
+    """Upload jobs as JSONL and start a 24h batch, returning its id"""
+    payload = io.BytesIO("\n".join(json.dumps(job) for job in jobs).encode())
+    batch_file = client.files.create(file=("batch.jsonl", payload), purpose="batch")
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h"
+    )
+    logger.info(f"Submitted batch {batch.id} with {len(jobs)} jobs")
+    return batch.id
+
+def wait_for_batch(batch_id, job_map):
+    """Poll a batch until it finishes, then publish results grouped by source run"""
+    try:
+        while True:
+            batch = client.batches.retrieve(batch_id)
+            if batch.status in BATCH_TERMINAL_STATUSES:
+                break
+            time.sleep(BATCH_POLL_INTERVAL)
+        
+        # Group answers back into one entry per source run
+        results_by_run = {}
+        if batch.status == "completed" and batch.output_file_id:
+            output = client.files.content(batch.output_file_id).text
+            for line in output.splitlines():
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                run_id, case_text, task_name = job_map[record["custom_id"]]
+                if record.get("error"):
+                    answer = f"Error: {record['error'].get('message', record['error'])}"
+                else:
+                    body = record["response"]["body"]
+                    answer = body["choices"][0]["message"]["content"] or "[Still empty after retry]"
+                results_by_run.setdefault(run_id, (case_text, {}))[1][task_name] = answer
+        
+        status = batch.status
+    except Exception as e:
+        logger.error(f"Batch {batch_id} polling failed: {type(e).__name__}: {str(e)}")
+        results_by_run, status = {}, "failed"
+    
+    logger.info(f"Batch {batch_id} finished with status {status}")
+    with batch_registry["lock"]:
+        batch_registry["batches"][batch_id] = {"status": status, "results": results_by_run}
+
+# Repeat a run requested via "Run fresh", skipping similar-case reuse
+fresh_run = st.session_state.pop("fresh_run", None)
+run_button = run_button or fresh_run == "single"
+run_all_button = run_all_button or fresh_run == "all"
+use_similar = fresh_run is None
+
+# Keep oversized presentations from inflating input tokens
+if (run_button or run_all_button) and case_clean:
+    case_clean, truncated = truncate_case(case_clean)
+    if truncated:
+        st.warning(f"⚠️ Input truncated to about {MAX_CASE_TOKENS} tokens.")
 
 # Process single task
-if run_button and case.strip():
+if run_button and case_clean:
     logger.info("=" * 50)
     logger.info(f"SINGLE TASK REQUEST - Task: {task}")
-    logger.info(f"Case input: {case[:100]}...")
+    logger.info(f"Case input: {case_clean[:100]}...")
     
-    with st.spinner(f"Analyzing {task}..."):
-        try:
-            answer = process_task(task, TOPICS[task], case.strip())
-            
-            # Save to history
-            history_entry = {
-                'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                'type': f'Single Task: {task}',
-                'case': case.strip(),
-                'results': {task: answer}
-            }
-            st.session_state.history.append(history_entry)
-            
-            # Display results
-            st.markdown("### 📋 Clinical Summary")
-            display_result(task, answer)
-            
-            # Copy button
-            with st.expander("📄 Copy Full Response"):
-                st.code(answer, language="")
-            
-        except Exception as e:
-            logger.error(f"ERROR: {type(e).__name__}: {str(e)}")
-            logger.error(f"Full error details:", exc_info=True)
-            st.error(f"Error: {str(e)}")
-            st.info("Make sure your OpenAI API key is set in the environment variables.")
+    st.markdown("### 📋 Clinical Summary")
+    
+    # Stream partial output into a placeholder, replaced by the formatted result
+    placeholder = st.empty()
+    try:
+        answer, cached = process_task(task, case_clean, placeholder, use_similar)
+        placeholder.empty()
+        
+        # Save to history
+        record_run(f'Single Task: {task}', case_clean, {task: answer})
+        
+        # Display results
+        display_result(task, answer, cached=cached, fresh_action="single")
+        
+        # Copy button
+        with st.expander("📄 Copy Full Response"):
+            st.code(answer, language="")
+        
+    except Exception as e:
+        placeholder.empty()
+        logger.error(f"ERROR: {type(e).__name__}: {str(e)}")
+        logger.error(f"Full error details:", exc_info=True)
+        st.error(f"Error: {str(e)}")
+        st.info("Make sure your OpenAI API key is set in the environment variables.")
 
 # Process all tasks
-if run_all_button and case.strip():
+if run_all_button and case_clean:
     logger.info("=" * 50)
     logger.info(f"ALL TASKS REQUEST")
-    logger.info(f"Case input: {case[:100]}...")
+    logger.info(f"Case input: {case_clean[:100]}...")
     
     st.markdown("### 🏥 Complete Clinical Analysis")
     
     # Store all responses
     all_responses = {}
     
+    # Bundled output streams here until it is split into the tabs
+    bundle_placeholder = st.empty()
+    
     # Create tabs instead of columns for better mobile responsiveness
     tabs = st.tabs(list(TOPICS.keys()))
+    tab_for = dict(zip(TOPICS.keys(), tabs))
+    
+    # Reuse per-task cache entries before issuing any request
+    results, embedding = lookup_cached_tasks(case_clean, use_similar)
+    missing = [task_name for task_name in TOPICS if task_name not in results]
+    
+    # One JSON-mode request covers every task when nothing is cached
+    if len(missing) == len(TOPICS):
+        try:
+            answers, cached = process_bundle(case_clean, bundle_placeholder, embedding)
+            results.update({task_name: (answers[task_name], cached) for task_name in TOPICS})
+            missing = []
+        except Exception as e:
+            logger.warning(f"Bundled request failed ({type(e).__name__}: {str(e)}) → running tasks separately")
+        bundle_placeholder.empty()
+    
+    # Stream remaining tasks into their own tabs while the requests run concurrently
+    placeholders = {}
+    if missing:
+        for task_name in missing:
+            with tab_for[task_name]:
+                placeholders[task_name] = st.empty()
+        task_results = asyncio.run(
+            run_all_tasks(case_clean, missing, [placeholders[task_name] for task_name in missing], embedding)
+        )
+        results.update(zip(missing, task_results))
     
-    # Process each task
-    for idx, (task_name, task_instruction) in enumerate(TOPICS.items()):
-        with st.spinner(f"Analyzing {task_name}..."):
-            try:
-                answer = process_task(task_name, task_instruction, case.strip())
+    for task_name in TOPICS:
+        result = results[task_name]
+        if task_name in placeholders:
+            placeholders[task_name].empty()
+        with tab_for[task_name]:
+            if isinstance(result, Exception):
+                logger.error(f"ERROR in {task_name}: {type(result).__name__}: {str(result)}")
+                all_responses[task_name] = f"Error: {str(result)}"
+                st.error(f"❌ Error: {str(result)}")
+            else:
+                answer, cached = result
                 all_responses[task_name] = answer
-                
-                # Display in respective tab
-                with tabs[idx]:
-                    display_result(task_name, answer)
-                    
-            except Exception as e:
-                logger.error(f"ERROR in {task_name}: {type(e).__name__}: {str(e)}")
-                all_responses[task_name] = f"Error: {str(e)}"
-                with tabs[idx]:
-                    st.error(f"❌ Error: {str(e)}")
+                display_result(task_name, answer, cached=cached, fresh_action="all")
     
     # Save to history
     if all_responses:
-        history_entry = {
-            'timestamp': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            'type': 'All Tasks',
-            'case': case.strip(),
-            'results': all_responses
-        }
-        st.session_state.history.append(history_entry)
+        record_run('All Tasks', case_clean, all_responses)
     
     # Combined copy section
     st.markdown("---")
     with st.expander("📄 Copy All Responses", expanded=False):
-        combined_text = f"Patient: {case.strip()}\n\n"
+        combined_text = f"Patient: {case_clean}\n\n"
         combined_text += "="*50 + "\n\n"
         
         for task_name, response in all_responses.items():
@@ -387,6 +1161,17 @@ if run_all_button and case.strip():
         st.code(combined_text, language="")
         st.caption("💡 Click the copy icon to copy all responses at once")
 
+# Merge finished batch results into history
+for batch_id in list(st.session_state.pending_batches):
+    with batch_registry["lock"]:
+        finished = batch_registry["batches"].pop(batch_id, None)
+    if finished:
+        st.session_state.pending_batches.remove(batch_id)
+        for case_text, results in finished["results"].values():
+            record_run('Batch Re-run', case_text, results)
+        if finished["status"] != "completed":
+            st.warning(f"⚠️ Batch {batch_id} ended with status: {finished['status']}")
+
 # History section
 if st.session_state.history:
     st.markdown("---")
@@ -398,9 +1183,23 @@ if st.session_state.history:
         st.caption(f"Showing {len(st.session_state.history)} previous runs")
     with col2:
         if st.button("🗑️ Clear", key="clear_history"):
-            st.session_state.history = []
+            delete_runs([entry['run_id'] for entry in st.session_state.history])
+            st.session_state.history = collections.deque(maxlen=HISTORY_MAX_RUNS)
             st.rerun()
     
+    # Re-run history against current prompts via the Batch API (50% cheaper, up to 24h)
+    if st.button("📦 Queue for Batch", key="queue_batch"):
+        try:
+            jobs, job_map = build_batch_jobs(st.session_state.history)
+            batch_id = submit_batch(jobs)
+            st.session_state.pending_batches.append(batch_id)
+            threading.Thread(target=wait_for_batch, args=(batch_id, job_map), daemon=True).start()
+        except Exception as e:
+            logger.error(f"Batch submission failed: {type(e).__name__}: {str(e)}")
+            st.error(f"Error: {str(e)}")
+    if st.session_state.pending_batches:
+        st.caption(f"📦 {len(st.session_state.pending_batches)} batch job(s) pending – results appear here when complete")
+    
     # Display history in reverse chronological order
     for idx, entry in enumerate(reversed(st.session_state.history)):
         with st.container():
@@ -410,31 +1209,35 @@ if st.session_state.history:
             with col1:
                 st.markdown(f"**Type:** {entry['type']}")
             with col2:
-                st.markdown(f"**Tasks:** {len(entry['results'])}")
+                st.markdown(f"**Tasks:** {entry['tasks']}")
             
-            # Show full patient presentation
-            st.info(f"**Patient:** {entry['case']}")
+            st.caption(f"**Patient:** {entry['case_preview']}")
             
-            # Show results for each task
-            st.markdown("**Results:**")
-            for task_name, response in entry['results'].items():
-                with st.container():
-                    st.markdown(f"**{task_name}:**")
-                    # Display formatted response
-                    if response and "Error:" not in response:
-                        lines = response.strip().split('\n')
-                        formatted = ""
-                        for line in lines:
-                            line = line.strip()
-                            if line:
-                                formatted += f"{line}\n"
-                        st.code(formatted, language="")
-                    else:
-                        st.error(response)
+            # Load full case and responses from the database only when requested
+            if st.toggle("Show details", key=f"show_{entry['run_id']}"):
+                case_text, results = load_run(entry['run_id'])
+                if not results:
+                    st.caption(f"Details expired after {HISTORY_RETENTION_DAYS} days.")
+                else:
+                    # Show full patient presentation
+                    st.info(f"**Patient:** {case_text}")
+                    
+                    # Show results for each task
+                    st.markdown("**Results:**")
+                    for task_name, response in results.items():
+                        with st.container():
+                            st.markdown(f"**{task_name}:**")
+                            # Display formatted response
+                            if response and "Error:" not in response:
+                                lines = (line.strip() for line in response.strip().split('\n'))
+                                formatted = "\n".join(line for line in lines if line)
+                                st.code(formatted, language="")
+                            else:
+                                st.error(response)
             
             st.markdown("---")
 
 # Footer with confirmation of o3 model
 st.markdown("---")
 st.caption("Clinical judgment required – not a substitute for professional assessment.")
-st.caption("🤖 Using OpenAI o3 model with medium reasoning effort")
\ No newline at end of file
+st.caption("🤖 Using OpenAI o3 model with low reasoning effort (escalates to medium when needed)")
\ No newline at end of file